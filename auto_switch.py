@@ -0,0 +1,233 @@
+"""Automatic per-game preset switching.
+
+Rules map a foreground process name or window title to a preset name and are
+stored in the config as "auto_switch_rules":
+
+    [{"type": "process", "pattern": "cs2.exe", "preset": "CS2"},
+     {"type": "title", "pattern": "Apex Legends", "preset": "Apex"}]
+
+This module has no Windows-only imports at load time, so the rule engine can be
+driven by QueueForegroundSource anywhere.
+"""
+import abc
+import ctypes
+import os
+import queue
+import re
+import threading
+
+
+class PresetRuleIndex:
+    """Precompiled rule lookup.
+
+    Process rules are an exact, case-insensitive dict lookup. All title rules are
+    folded into one regex of lookahead alternatives that is compiled once; matching
+    a title is a single finditer pass, though each position still tries the rules
+    in turn. Process rules win over title rules, and among matching title rules the
+    one listed first wins. Malformed rules are skipped with a warning.
+    """
+
+    def __init__(self, rules):
+        self.by_process = {}
+        title_patterns = []
+        self.title_presets = []
+        if not isinstance(rules, list):
+            print(f"Ignoring auto switch rules that are not a list: {rules!r}")
+            rules = []
+        for rule in rules:
+            if not isinstance(rule, dict):
+                print(f"Ignoring auto switch rule that is not an object: {rule!r}")
+                continue
+            kind = rule.get("type")
+            pattern = str(rule.get("pattern", "")).strip()
+            preset = rule.get("preset")
+            if not pattern or not preset:
+                continue
+            if kind == "process":
+                self.by_process.setdefault(pattern.lower(), preset)
+            elif kind == "title":
+                title_patterns.append(f"(?P<r{len(title_patterns)}>{re.escape(pattern)})")
+                self.title_presets.append(preset)
+            else:
+                print(f"Ignoring auto switch rule with unknown type: {kind}")
+        # Zero-width lookahead so overlapping matches at every position are seen;
+        # at one position the alternation already prefers the earliest rule
+        self.title_regex = None
+        if title_patterns:
+            self.title_regex = re.compile("(?=" + "|".join(title_patterns) + ")", re.IGNORECASE)
+
+    def presets(self):
+        return set(self.by_process.values()) | set(self.title_presets)
+
+    def match(self, process_name, title):
+        if process_name:
+            preset = self.by_process.get(process_name.lower())
+            if preset:
+                return preset
+        if title and self.title_regex:
+            best = None
+            for found in self.title_regex.finditer(title):
+                rank = int(found.lastgroup[1:])
+                if best is None or rank < best:
+                    best = rank
+                    if rank == 0:
+                        break
+            if best is not None:
+                return self.title_presets[best]
+        return None
+
+
+class ForegroundSource(abc.ABC):
+    """Reports the foreground window as (process_name, title).
+
+    watch() blocks until stop_event is set, calling callback(process_name, title)
+    whenever the foreground window may have changed. Repeated reports of the same
+    window are fine; ForegroundWatcher filters them.
+    """
+
+    @abc.abstractmethod
+    def watch(self, callback, stop_event, poll_interval):
+        pass
+
+
+class QueueForegroundSource(ForegroundSource):
+    """Foreground feed pushed by hand, for tests and non-Windows platforms"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def push(self, process_name, title=""):
+        self.events.put((process_name, title))
+
+    def watch(self, callback, stop_event, poll_interval):
+        while not stop_event.is_set():
+            try:
+                process_name, title = self.events.get(timeout=poll_interval)
+            except queue.Empty:
+                continue
+            callback(process_name, title)
+
+
+class WindowsForegroundSource(ForegroundSource):
+    """Tracks the foreground window with a WinEvent hook, plus a low-rate poll.
+
+    The poll catches title changes inside the same window and keeps things working
+    if the hook cannot be installed.
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    QS_ALLINPUT = 0x04FF
+    PM_REMOVE = 0x0001
+
+    def __init__(self):
+        from ctypes import wintypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.user32.GetForegroundWindow.restype = wintypes.HWND
+        self.kernel32.OpenProcess.restype = wintypes.HANDLE
+        self.kernel32.QueryFullProcessImageNameW.argtypes = [
+            wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD)]
+        self.kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    def current(self):
+        hwnd = self.user32.GetForegroundWindow()
+        if not hwnd:
+            return "", ""
+        length = self.user32.GetWindowTextLengthW(hwnd)
+        buf = ctypes.create_unicode_buffer(length + 1)
+        self.user32.GetWindowTextW(hwnd, buf, length + 1)
+        title = buf.value
+
+        pid = self.wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        process_name = ""
+        handle = self.kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid.value)
+        if handle:
+            try:
+                path = ctypes.create_unicode_buffer(1024)
+                size = self.wintypes.DWORD(len(path))
+                if self.kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                    process_name = os.path.basename(path.value)
+            finally:
+                self.kernel32.CloseHandle(handle)
+        return process_name, title
+
+    def watch(self, callback, stop_event, poll_interval):
+        wintypes = self.wintypes
+
+        def report(*_):
+            try:
+                callback(*self.current())
+            except Exception as e:
+                print(f"Error reading foreground window: {e}")
+
+        # The hook delivers events through this thread's message queue
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        proc = WinEventProc(report)
+        hook = self.user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                           0, proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+        if not hook:
+            print("Foreground event hook unavailable, polling only")
+
+        msg = wintypes.MSG()
+        timeout_ms = int(poll_interval * 1000)
+        try:
+            report()
+            while not stop_event.is_set():
+                self.user32.MsgWaitForMultipleObjects(0, None, False, timeout_ms, self.QS_ALLINPUT)
+                while self.user32.PeekMessageW(ctypes.byref(msg), 0, 0, 0, self.PM_REMOVE):
+                    self.user32.TranslateMessage(ctypes.byref(msg))
+                    self.user32.DispatchMessageW(ctypes.byref(msg))
+                report()
+        finally:
+            if hook:
+                self.user32.UnhookWinEvent(hook)
+
+
+class ForegroundWatcher:
+    """Runs a ForegroundSource on a daemon thread and reports rule matches.
+
+    on_switch(preset_name) is called on the watcher thread, only when the matched
+    preset changes, so callers must hand it over to their UI thread.
+    """
+
+    def __init__(self, source, rules, on_switch, poll_interval=1.0):
+        self.source = source
+        self.index = PresetRuleIndex(rules)
+        self.on_switch = on_switch
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_window = None
+        self.last_preset = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        try:
+            self.source.watch(self.handle_foreground, self.stop_event, self.poll_interval)
+        except Exception as e:
+            print(f"Foreground watcher stopped: {e}")
+
+    def handle_foreground(self, process_name, title):
+        window = (process_name, title)
+        if window == self.last_window:
+            return
+        self.last_window = window
+        preset = self.index.match(process_name, title)
+        if preset != self.last_preset:
+            self.last_preset = preset
+            if preset:
+                self.on_switch(preset)
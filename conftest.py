@@ -0,0 +1 @@
+# Lets tests import the application modules (share_code, auto_switch, ...) from the repo root.
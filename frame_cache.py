@@ -0,0 +1,60 @@
+"""On-disk cache of rendered crosshair frames.
+
+Each file is one binary PPM frame followed by the crc32 of the PPM. Tk decodes
+PPM natively, so the first frame at startup needs neither PIL nor the shape
+compiler. Files are named by frame_cache_key, which hashes everything that
+affects the rendered pixels; a stale or damaged file is simply ignored.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+
+FRAME_CACHE_VERSION = 1
+FRAME_CRC = struct.Struct("<I")
+
+def ppm_header(width, height):
+    return f"P6\n{width} {height}\n255\n".encode("ascii")
+
+def frame_cache_key(style, shape_source, values, width, height, image_path=None):
+    """Hash of everything that affects a rendered frame, or None if it cannot be cached.
+
+    values are the shape parameters other than the image path. When image_path is
+    given its content is hashed, so editing the image in place changes the key.
+    """
+    image_hash = None
+    if image_path is not None:
+        try:
+            with open(image_path, "rb") as f:
+                image_hash = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+    key = json.dumps([FRAME_CACHE_VERSION, width, height, style, shape_source, list(values), image_hash],
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def read_frame_cache(path, width, height):
+    """Memory-map a cached frame and return its PPM bytes; None if missing, corrupt or stale"""
+    header = ppm_header(width, height)
+    expected = len(header) + width * height * 3
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) != expected + FRAME_CRC.size or mm[:len(header)] != header:
+                    return None
+                ppm = mm[:expected]
+                if FRAME_CRC.unpack_from(mm, expected)[0] != zlib.crc32(ppm):
+                    return None
+                return ppm
+    except (OSError, ValueError):
+        # ValueError: mmap refuses empty files
+        return None
+
+def write_frame_cache(path, ppm):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ppm)
+        f.write(FRAME_CRC.pack(zlib.crc32(ppm)))
+    os.replace(tmp_path, path)
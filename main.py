@@ -4,23 +4,252 @@ import ctypes
 from ctypes import wintypes
 import json
 import os
+import re
+import gc
+import time
 import sys
 import base64
-from PIL import Image, ImageTk
-import pystray
-from pystray import MenuItem as item
-import threading
+from PIL import Image, ImageTk, ImageDraw
 import winreg
 import subprocess
 import keyboard
+from auto_switch import ForegroundWatcher, WindowsForegroundSource
+from share_code import encode_share_code, decode_share_codes
+from ui_events import UiEventQueue
+from tray import TrayService
+from visibility import CanvasVisibility
+from frame_cache import frame_cache_key, ppm_header, read_frame_cache, write_frame_cache
 
 # Windows API constants for click-through
 GWL_EXSTYLE = -20
 WS_EX_LAYERED = 0x00080000
 WS_EX_TRANSPARENT = 0x00000020
 
+# One frame at 60 Hz, the latency budget for toggles and restores
+FRAME_MS = 16
+
+class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+    _fields_ = [
+        ("cb", wintypes.DWORD),
+        ("PageFaultCount", wintypes.DWORD),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+def get_process_rss():
+    """Return the working set (RSS) of this process in bytes, or 0 if unavailable"""
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    except Exception:
+        pass
+    return 0
+
+# Crosshair shape language.
+# A shape is a list of layers drawn bottom to top. Every field may be a constant
+# or a reference to the live settings: "$size", "$thickness", "$dot", "$color",
+# "$image_path", optionally scaled as "$size/2" or "$dot*1.5".
+#   cross: arms (any of "udlr", "ldr" gives a T), length, gap, thickness, color, opacity
+#   line:  x1, y1, x2, y2 relative to the centre, thickness, color, opacity
+#   ring:  radius, thickness, color, opacity
+#   dot:   radius, color, opacity
+#   image: path, dx, dy
+SHAPE_PARAMS = ("size", "thickness", "dot", "color", "image_path")
+
+LAYER_FIELDS = {
+    "cross": {"arms": "udlr", "length": "$size/2", "gap": 0, "thickness": "$thickness",
+              "color": "$color", "opacity": 1},
+    "line": {"x1": 0, "y1": 0, "x2": 0, "y2": 0, "thickness": "$thickness",
+             "color": "$color", "opacity": 1},
+    "ring": {"radius": "$size/2", "thickness": "$thickness", "color": "$color", "opacity": 1},
+    "dot": {"radius": "$dot/2", "color": "$color", "opacity": 1},
+    "image": {"path": "$image_path", "dx": 0, "dy": 0},
+}
+
+BUILTIN_SHAPES = {
+    "十字": [{"type": "cross"}],
+    "圆点": [{"type": "dot"}],
+    "混合": [{"type": "cross"}, {"type": "dot"}],
+    "圆圈": [{"type": "ring"}],
+    "自定义": [{"type": "image"}],
+}
+
+# Older configs stored the English style names
+STYLE_ALIASES = {"Cross": "十字", "Dot": "圆点", "Both": "混合", "Circle": "圆圈", "Custom": "自定义"}
+
+# Colors Tk accepts in hex form: #RGB, #RRGGBB, #RRRGGGBBB, #RRRRGGGGBBBB
+HEX_COLOR = re.compile(r"#(?:[0-9a-fA-F]{3}){1,4}")
+
+# Tk canvases have no per-item alpha, so opacity is approximated with stipple masks
+OPACITY_STIPPLES = ((0.875, ""), (0.625, "gray75"), (0.375, "gray50"), (0.19, "gray25"), (0.0, "gray12"))
+
+# name -> (parsed layers, uses_image, names of the SHAPE_PARAMS it references)
+SHAPES = {}
+# name -> definition as written, used to key the on-disk frame cache
+SHAPE_SOURCES = {}
+
+def _parse_value(value):
+    """Turn a layer field into (callable taking the settings dict, referenced parameter or None)"""
+    if isinstance(value, str) and value.startswith("$"):
+        ref, op, factor = value[1:], None, 1.0
+        for symbol in ("*", "/"):
+            if symbol in ref:
+                ref, factor = ref.split(symbol, 1)
+                op, factor = symbol, float(factor)
+                break
+        ref = ref.strip()
+        if ref not in SHAPE_PARAMS:
+            raise ValueError(f"Unknown shape parameter: {value}")
+        if op == "*":
+            return (lambda params: params[ref] * factor), ref
+        if op == "/":
+            return (lambda params: params[ref] / factor), ref
+        return (lambda params: params[ref]), ref
+    if not isinstance(value, (int, float, str)):
+        raise ValueError(f"Invalid shape value: {value!r}")
+    return (lambda params: value), None
+
+def parse_shape(layers):
+    """Validate a shape definition and pre-parse its fields; done once per shape"""
+    parsed = []
+    used = set()
+    for layer in layers:
+        kind = layer.get("type")
+        if kind not in LAYER_FIELDS:
+            raise ValueError(f"Unknown layer type: {kind}")
+        fields = dict(LAYER_FIELDS[kind])
+        for key, value in layer.items():
+            if key == "type":
+                continue
+            if key not in fields:
+                raise ValueError(f"Unknown field '{key}' for layer '{kind}'")
+            fields[key] = value
+        color = fields.get("color")
+        if isinstance(color, str) and color.startswith("#") and not HEX_COLOR.fullmatch(color):
+            raise ValueError(f"Invalid color '{color}' for layer '{kind}'")
+        resolvers = {}
+        for key, value in fields.items():
+            resolvers[key], ref = _parse_value(value)
+            used.add(ref)
+        parsed.append((kind, resolvers))
+    params_used = tuple(name for name in SHAPE_PARAMS if name in used)
+    return tuple(parsed), any(kind == "image" for kind, _ in parsed), params_used
+
+def register_shape(name, layers):
+    SHAPES[name] = parse_shape(layers)
+    SHAPE_SOURCES[name] = layers
+
+def resolve_shape(style):
+    return SHAPES.get(STYLE_ALIASES.get(style, style))
+
+def shape_uses_image(style):
+    shape = resolve_shape(style)
+    return bool(shape and shape[1])
+
+def preset_params(preset):
+    """Rendering parameters of a saved preset, with the same defaults as load_preset"""
+    return {
+        "style": preset.get("style", "十字"),
+        "size": preset.get("size", 20),
+        "thickness": preset.get("thickness", 2),
+        "dot": preset.get("dot", 4),
+        "color": preset.get("color", "#00FF00"),
+        "image_path": preset.get("image_path", "")
+    }
+
+def config_params(config):
+    """Rendering parameters currently selected in the panel's config variables"""
+    return {name: config[name].get() for name in ("style",) + SHAPE_PARAMS}
+
+def _opacity_stipple(opacity):
+    for threshold, stipple in OPACITY_STIPPLES:
+        if opacity >= threshold:
+            return stipple
+    return OPACITY_STIPPLES[-1][1]
+
+def compile_shape(layers, params, cx, cy, load_image):
+    """Flatten parsed layers into a display list of (create_fn, coords, options)"""
+    display_list = []
+    for kind, fields in layers:
+        v = {key: resolve(params) for key, resolve in fields.items()}
+        if kind == "image":
+            image = load_image(v["path"])
+            if image is not None:
+                display_list.append((tk.Canvas.create_image, (cx + int(v["dx"]), cy + int(v["dy"])),
+                                     {"image": image, "anchor": "center"}))
+            continue
+
+        opacity = float(v["opacity"])
+        if opacity <= 0:
+            # Fully transparent layers are not drawn at all
+            continue
+        color = v["color"]
+        stipple = _opacity_stipple(opacity)
+        if kind == "cross":
+            arms, length, gap = v["arms"], int(v["length"]), int(v["gap"])
+            opts = {"fill": color, "width": int(v["thickness"])}
+            if stipple:
+                opts["stipple"] = stipple
+            segments = []
+            for first, second, dx, dy in (("l", "r", 1, 0), ("u", "d", 0, 1)):
+                if gap == 0 and first in arms and second in arms:
+                    # Opposite arms without a gap collapse into one line
+                    segments.append((cx - dx * length, cy - dy * length, cx + dx * length, cy + dy * length))
+                    continue
+                if first in arms:
+                    segments.append((cx - dx * gap, cy - dy * gap, cx - dx * length, cy - dy * length))
+                if second in arms:
+                    segments.append((cx + dx * gap, cy + dy * gap, cx + dx * length, cy + dy * length))
+            for coords in segments:
+                display_list.append((tk.Canvas.create_line, coords, opts))
+        elif kind == "line":
+            opts = {"fill": color, "width": int(v["thickness"])}
+            if stipple:
+                opts["stipple"] = stipple
+            coords = (cx + int(v["x1"]), cy + int(v["y1"]), cx + int(v["x2"]), cy + int(v["y2"]))
+            display_list.append((tk.Canvas.create_line, coords, opts))
+        elif kind == "ring":
+            r = int(v["radius"])
+            opts = {"outline": color, "width": int(v["thickness"])}
+            if stipple:
+                opts["outlinestipple"] = stipple
+            display_list.append((tk.Canvas.create_oval, (cx - r, cy - r, cx + r, cy + r), opts))
+        elif kind == "dot":
+            r = int(v["radius"])
+            opts = {"fill": color, "outline": color}
+            if stipple:
+                opts["stipple"] = stipple
+                opts["outlinestipple"] = stipple
+            display_list.append((tk.Canvas.create_oval, (cx - r, cy - r, cx + r, cy + r), opts))
+    return tuple(display_list)
+
+for _name, _layers in BUILTIN_SHAPES.items():
+    register_shape(_name, _layers)
+
+def frame_key(params, width, height):
+    """frame_cache_key for a set of rendering parameters, or None for an unknown style"""
+    style = STYLE_ALIASES.get(params['style'], params['style'])
+    if style not in SHAPES:
+        return None
+    image_path = params['image_path'] if shape_uses_image(style) else None
+    return frame_cache_key(style, SHAPE_SOURCES[style], [params[name] for name in SHAPE_PARAMS if name != "image_path"],
+                           width, height, image_path)
+
 class CrosshairOverlay(tk.Toplevel):
-    def __init__(self, master, config):
+    # Dimensions (fixed small area around center to minimize impact, but large enough for big crosshairs)
+    width = 200
+    height = 200
+
+    def __init__(self, master, config, first_frame=None):
         super().__init__(master)
         self.config = config
         self.title("Overlay")
@@ -34,23 +263,31 @@ class CrosshairOverlay(tk.Toplevel):
         self.config_bg(self.bg_color)
         self.wm_attributes("-transparentcolor", self.bg_color)
         
-        # Dimensions (fixed small area around center to minimize impact, but large enough for big crosshairs)
-        self.width = 200
-        self.height = 200
-        
         # Canvas
         self.canvas = tk.Canvas(self, width=self.width, height=self.height, 
                                 bg=self.bg_color, highlightthickness=0)
         self.canvas.pack()
         
-        # Initial Draw
-        self.redraw()
+        # Compiled display lists keyed by style and rendering parameters
+        self.display_lists = {}
+        self.pinned_lists = {}
+        # Decoded images shared by every display list: path -> (mtime, PhotoImage).
+        # This also keeps the images alive and maps them back to their file for render_frame.
+        self.images = {}
+
+        # Hiding only hides the canvas items; the window stays mapped, topmost and click-through
+        self.visibility = CanvasVisibility(self.canvas, FRAME_MS)
+
+        # Initial Draw: a frame from the disk cache if we have one, the full renderer otherwise
+        self.first_frame = first_frame
+        if first_frame is not None:
+            self.canvas.create_image(self.width // 2, self.height // 2, image=first_frame, anchor="center")
+        else:
+            self.redraw()
         
         # Apply click-through
         self.after(100, self.apply_click_through)
         
-        self.image_ref = None
-        
         # Start keep-on-top loop
         self.keep_on_top()
 
@@ -84,44 +321,109 @@ class CrosshairOverlay(tk.Toplevel):
 
     def redraw(self):
         self.canvas.delete("all")
-        cx, cy = self.width // 2, self.height // 2
-        
-        size = self.config['size'].get()
-        color = self.config['color'].get()
-        thickness = self.config['thickness'].get()
-        dot = self.config['dot'].get()
-        style = self.config['style'].get()
-        
-        if style == "Cross" or style == "Both" or style == "十字" or style == "混合":
-            # Horizontal
-            self.canvas.create_line(cx - size//2, cy, cx + size//2, cy, 
-                                    fill=color, width=thickness)
-            # Vertical
-            self.canvas.create_line(cx, cy - size//2, cx, cy + size//2, 
-                                    fill=color, width=thickness)
-            
-        if style == "Dot" or style == "Both" or style == "圆点" or style == "混合":
-            r = dot // 2
-            self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, 
-                                    fill=color, outline=color)
-        
-        if style == "Circle" or style == "圆圈":
-            r = size // 2
-            self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r,
-                                    outline=color, width=thickness)
-                                    
-        if style == "Custom" or style == "自定义":
-            image_path = self.config.get('image_path', {}).get()
-            if image_path and os.path.exists(image_path):
-                try:
-                    # Use binary read and base64 encoding to support non-ASCII paths (e.g. Chinese)
-                    with open(image_path, "rb") as f:
-                        img_data = f.read()
-                    b64_data = base64.b64encode(img_data)
-                    self.image_ref = tk.PhotoImage(data=b64_data)
-                    self.canvas.create_image(cx, cy, image=self.image_ref, anchor="center")
-                except Exception as e:
-                    print(f"Error loading image: {e}")
+        self.first_frame = None
+        canvas = self.canvas
+        for create, coords, opts in self.get_display_list():
+            try:
+                create(canvas, *coords, **opts)
+            except tk.TclError as e:
+                # e.g. a color name Tk does not know; skip the item rather than fail the redraw
+                print(f"Error drawing crosshair item: {e}")
+        self.visibility.apply()
+
+    def set_visible(self, visible, requested_at=None):
+        self.visibility.set_visible(visible, requested_at)
+
+    def render_key(self, params):
+        """Cache key for a set of rendering parameters: the style and only the parameters it uses"""
+        shape = resolve_shape(params['style'])
+        if shape is None:
+            return (params['style'],)
+        key = (params['style'],) + tuple(params[name] for name in shape[2])
+        if shape[1]:
+            # Pick up in-place edits of the image file
+            try:
+                key += (os.path.getmtime(params['image_path']),)
+            except OSError:
+                key += (None,)
+        return key
+
+    def get_display_list(self, params=None):
+        """Return the cached display list for params (default: current settings), compiling it on a miss"""
+        if params is None:
+            params = config_params(self.config)
+        shape = resolve_shape(params['style'])
+        if shape is None:
+            return ()
+        key = self.render_key(params)
+
+        display_list = self.pinned_lists.get(key)
+        if display_list is None:
+            display_list = self.display_lists.get(key)
+        if display_list is None:
+            try:
+                display_list = compile_shape(shape[0], params, self.width // 2, self.height // 2, self.load_image)
+            except Exception as e:
+                print(f"Error compiling crosshair shape '{params['style']}': {e}")
+                display_list = ()
+            if len(self.display_lists) >= 64:
+                self.display_lists.pop(next(iter(self.display_lists)))
+            self.display_lists[key] = display_list
+        return display_list
+
+    def prerender(self, presets):
+        """Compile and pin the display lists of presets that may be switched to at any moment"""
+        pinned = {}
+        for preset in presets:
+            params = preset_params(preset)
+            pinned[self.render_key(params)] = self.get_display_list(params)
+        self.pinned_lists = pinned
+
+    def load_image(self, image_path):
+        """Return the decoded image for image_path, decoding only when the file is new or changed"""
+        if not image_path or not os.path.exists(image_path):
+            return None
+        try:
+            mtime = os.path.getmtime(image_path)
+            cached = self.images.get(image_path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            # Use binary read and base64 encoding to support non-ASCII paths (e.g. Chinese)
+            with open(image_path, "rb") as f:
+                img_data = f.read()
+            b64_data = base64.b64encode(img_data)
+            image = tk.PhotoImage(data=b64_data)
+            self.images[image_path] = (mtime, image)
+            return image
+        except Exception as e:
+            print(f"Error loading image: {e}")
+            return None
+
+    def render_frame(self, params):
+        """Rasterize the display list for params into PPM bytes for the disk cache.
+
+        Pixels left at the background color stay transparent once shown. Opacity
+        stipples are drawn solid; the live renderer replaces this frame right away.
+        """
+        bg = tuple(int(self.bg_color[i:i + 2], 16) for i in (1, 3, 5))
+        frame = Image.new("RGB", (self.width, self.height), bg)
+        draw = ImageDraw.Draw(frame)
+        for create, coords, opts in self.get_display_list(params):
+            if create is tk.Canvas.create_line:
+                draw.line(coords, fill=opts["fill"], width=opts["width"])
+            elif create is tk.Canvas.create_oval and "width" in opts:
+                # Tk centres the outline on the bounding box, PIL draws it inside
+                half = opts["width"] / 2
+                x1, y1, x2, y2 = coords
+                draw.ellipse((x1 - half, y1 - half, x2 + half, y2 + half), outline=opts["outline"], width=opts["width"])
+            elif create is tk.Canvas.create_oval:
+                draw.ellipse(coords, fill=opts["fill"], outline=opts["outline"])
+            elif create is tk.Canvas.create_image:
+                image_path = next(path for path, (_, image) in self.images.items() if image is opts["image"])
+                source = Image.open(image_path).convert("RGBA")
+                x, y = coords
+                frame.paste(source, (x - source.width // 2, y - source.height // 2), source)
+        return ppm_header(self.width, self.height) + frame.tobytes()
 
     def set_position(self, x, y):
         # x, y are center coordinates
@@ -132,7 +434,10 @@ class CrosshairOverlay(tk.Toplevel):
 
 class ControlPanel:
     def __init__(self):
+        launch_time = time.perf_counter()
         self.root = tk.Tk()
+        # Stay hidden until the widgets exist so the crosshair can be painted first
+        self.root.withdraw()
         
         # Check Admin Status
         self.is_admin = ctypes.windll.shell32.IsUserAnAdmin()
@@ -147,7 +452,7 @@ class ControlPanel:
             self.root.iconbitmap(self.resource_path("tx.ico"))
         except:
             pass
-        self.root.geometry("360x560")
+        self.root.geometry("360x590")
         self.root.resizable(False, False)
         
         self.overlay = None
@@ -171,23 +476,52 @@ class ControlPanel:
             'style': tk.StringVar(value="十字"),
             'image_path': tk.StringVar(value=""),
             'force_admin': tk.BooleanVar(value=False),
-            'hide_hotkey': tk.StringVar(value="")
+            'hide_hotkey': tk.StringVar(value=""),
+            'low_memory_tray': tk.BooleanVar(value=False)
         }
         
         self.presets = {}
+        self.shapes = {}
+        self.auto_switch_rules = []
+        self.auto_switch = None
         self.current_preset_name = tk.StringVar()
         self.crosshair_visible = True
-        
+        self.bind_hook_id = None
+
+        # Events from the hotkey and tray threads are handed to the Tk thread through this queue
+        self.ui_events = UiEventQueue(self.root)
+        self.tray = TrayService(self)
+
         self.load_config()
-        
+
+        # Show the crosshair before building the panel, straight from the disk cache when possible
+        first_frame = self.load_first_frame()
+        self.start_overlay(first_frame)
+        self.root.update()
+        source = "cached" if first_frame is not None else "rendered"
+        print(f"First crosshair frame after {(time.perf_counter() - launch_time) * 1000:.1f} ms ({source})")
+
         self.create_widgets()
-        
-        self.start_overlay()
+        self.panel_built = True
+        self.root.deiconify()
+
+        # Register the global hotkey once; it must survive panel teardown in tray mode
+        if self.config['hide_hotkey'].get():
+            try:
+                keyboard.add_hotkey(self.config['hide_hotkey'].get(), self.request_toggle)
+            except Exception as e:
+                print(f"Error registering hotkey: {e}")
+
+        # Pick up anything posted before the main loop started
+        self.root.after_idle(self.ui_events.drain)
         
         # Trigger style change logic to set button state and load image if needed
         # Call this AFTER starting overlay so update_overlay works
         self.on_style_change(event="Startup") 
         self.update_preset_list()
+
+        self.start_auto_switch()
+        self.root.after(1000, self.update_frame_cache)
         
         # Add keyboard bindings to the Control Panel for fine tuning
         self.root.bind("<Up>", lambda e: self.adjust_pos(0, -1))
@@ -197,9 +531,6 @@ class ControlPanel:
         
         self.root.protocol("WM_DELETE_WINDOW", self.quit_application)
         
-        # Start tray icon in separate thread
-        self.tray_icon = None
-        
         self.root.mainloop()
 
     def check_startup(self):
@@ -234,32 +565,54 @@ class ControlPanel:
 
     def minimize_to_tray(self):
         self.root.withdraw()
-        self.create_tray_icon()
+        if self.config['low_memory_tray'].get():
+            self.destroy_widgets()
+        self.tray.set_visible(True)
+
+    def destroy_widgets(self):
+        """Tear down the control panel while hidden, keeping only the overlay alive.
 
-    def create_tray_icon(self):
-        if self.tray_icon:
+        The overlay, the config variables it reads and the global hotkey stay
+        registered; everything else is rebuilt by show_window from that state.
+        """
+        if not self.panel_built:
             return
-            
-        try:
-            icon_image = Image.open(self.resource_path("tx.ico"))
-        except:
-            # Fallback if icon load fails
-            icon_image = Image.new('RGB', (64, 64), color = (73, 109, 137))
-            
-        def show_window(icon, item):
-            icon.stop()
-            self.root.after(0, self.root.deiconify)
-            self.tray_icon = None
+        # A half-finished hotkey bind would otherwise capture the next key pressed in game
+        self.cancel_hotkey_bind()
+        rss_before = get_process_rss()
+        for child in self.root.winfo_children():
+            if child is not self.overlay:
+                child.destroy()
+        self.panel_built = False
+        gc.collect()
+        rss_after = get_process_rss()
+        if rss_before and rss_after:
+            print(f"Tray mode RSS: {rss_before / 1048576:.1f} MB -> {rss_after / 1048576:.1f} MB")
 
-        def quit_app(icon, item):
-            icon.stop()
-            self.root.after(0, self.quit_application)
+    def show_window(self, requested_at=None):
+        start = time.perf_counter()
+        if not self.panel_built:
+            self.create_widgets()
+            self.panel_built = True
+            self.update_preset_list()
+            self.root.update_idletasks()
+            print(f"Control panel rebuilt in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self.root.deiconify()
+        self.tray.set_visible(False)
+        latency = time.perf_counter() - (requested_at or start)
+        if latency * 1000 > FRAME_MS:
+            print(f"Slow restore from tray: {latency * 1000:.1f} ms")
 
-        menu = (item('显示设置', show_window, default=True), item('退出程序', quit_app))
-        self.tray_icon = pystray.Icon("name", icon_image, "自定义准心", menu)
-        
-        # Run tray icon in a separate thread to avoid blocking main loop
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+    def toggle_low_memory_tray(self):
+        self.config['low_memory_tray'].set(not self.config['low_memory_tray'].get())
+        if self.config['low_memory_tray'].get() and self.root.state() == "withdrawn":
+            self.destroy_widgets()
+        self.tray.refresh()
+        self.save_config()
+
+    def active_preset_name(self):
+        name = self.current_preset_name.get()
+        return name if name in self.presets else ""
 
     def restart_as_admin(self):
         try:
@@ -288,7 +641,12 @@ class ControlPanel:
             messagebox.showerror("错误", f"无法重启：{e}")
 
     def quit_application(self):
+        if self.overlay:
+            count, average, worst = self.overlay.visibility.stats()
+            if count:
+                print(f"Crosshair toggles: {count}, average {average:.2f} ms, worst {worst:.2f} ms")
         self.save_config()
+        self.tray.stop()
         self.root.quit()
         sys.exit()
 
@@ -304,7 +662,7 @@ class ControlPanel:
         
         ttk.Label(style_frame, text="类型:").grid(row=0, column=0, padx=5, pady=5)
         type_cb = ttk.Combobox(style_frame, textvariable=self.config['style'], 
-                               values=["十字", "圆点", "混合", "圆圈", "自定义"], state="readonly")
+                               values=list(SHAPES), state="readonly")
         type_cb.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         type_cb.bind("<<ComboboxSelected>>", self.on_style_change)
         
@@ -361,8 +719,9 @@ class ControlPanel:
         self.preset_cb.bind("<<ComboboxSelected>>", self.load_preset)
         self.update_preset_list()
         
-        # Set placeholder
-        self.preset_cb.set("<--下拉选择预设-->")
+        # Set placeholder (keep the selected preset when the panel is rebuilt from tray)
+        if not self.current_preset_name.get():
+            self.preset_cb.set("<--下拉选择预设-->")
         
         btn_frame = ttk.Frame(preset_frame)
         btn_frame.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
@@ -375,6 +734,8 @@ class ControlPanel:
         ttk.Button(btn_frame, text="删除", command=self.delete_preset).grid(row=0, column=1, sticky="ew", padx=2)
         ttk.Button(btn_frame, text="导入", command=self.import_preset).grid(row=0, column=2, sticky="ew", padx=2)
         ttk.Button(btn_frame, text="分享", command=self.export_preset).grid(row=0, column=3, sticky="ew", padx=2)
+        ttk.Button(btn_frame, text="复制分享码", command=self.copy_share_code).grid(row=1, column=0, columnspan=2, sticky="ew", padx=2, pady=(4, 0))
+        ttk.Button(btn_frame, text="粘贴分享码", command=self.paste_share_codes).grid(row=1, column=2, columnspan=2, sticky="ew", padx=2, pady=(4, 0))
 
         # System
         sys_frame = ttk.Frame(self.root)
@@ -411,37 +772,43 @@ class ControlPanel:
         # Update button text if hotkey exists
         if self.config['hide_hotkey'].get():
             self.hotkey_btn.configure(text=f"快捷键: {self.config['hide_hotkey'].get()}")
-            try:
-                keyboard.add_hotkey(self.config['hide_hotkey'].get(), self.toggle_crosshair_visible)
-            except Exception as e:
-                print(f"Error registering hotkey: {e}")
+        if not self.crosshair_visible:
+            self.toggle_btn.configure(text="点击显示准星")
 
         # Status
         self.status_label = ttk.Label(self.root, text="作者moligod（B站抖音快手小红书同名）炸撤离点群727712220", foreground="green")
         self.status_label.pack(side="bottom", pady=(0, 5))
         ttk.Label(self.root, text="如若出现问题优先管理员启动，游戏内用快捷键必须管理员启动", foreground="red").pack(side="bottom", pady=(5, 0))
 
-    def toggle_crosshair_visible(self):
+    def post(self, callback, *args):
+        """Run callback on the Tk thread; safe to call from any thread"""
+        self.ui_events.post(callback, *args)
+
+    def request_toggle(self):
+        # Called on the keyboard hook thread
+        self.post(self.toggle_crosshair_visible, time.perf_counter())
+
+    def toggle_crosshair_visible(self, requested_at=None):
         if not self.overlay:
             return
-            
-        if self.crosshair_visible:
-            self.overlay.withdraw()
-            self.crosshair_visible = False
-            self.toggle_btn.configure(text="点击显示准星")
-        else:
-            self.overlay.deiconify()
-            self.overlay.keep_on_top()
-            self.crosshair_visible = True
-            self.toggle_btn.configure(text="点击隐藏准星")
+
+        self.crosshair_visible = not self.crosshair_visible
+        self.overlay.set_visible(self.crosshair_visible, requested_at)
+        if self.panel_built:
+            self.toggle_btn.configure(text="点击隐藏准星" if self.crosshair_visible else "点击显示准星")
+        self.tray.refresh()
 
     def bind_hotkey(self):
+        self.cancel_hotkey_bind()
         self.hotkey_btn.configure(text="按键 (ESC取消)...")
         self.root.update()
         
         def on_key(event):
+            # Ignore presses queued after the bind finished or was cancelled
+            if self.bind_hook_id != hook_id:
+                return
             # Unhook first
-            keyboard.unhook(hook_id)
+            self.cancel_hotkey_bind()
             
             key_name = event.name
             
@@ -475,7 +842,7 @@ class ControlPanel:
             
             # Register new hotkey
             try:
-                keyboard.add_hotkey(key_name, self.toggle_crosshair_visible)
+                keyboard.add_hotkey(key_name, self.request_toggle)
             except Exception as e:
                 messagebox.showerror("错误", f"无法绑定快捷键: {e}")
                 self.hotkey_btn.configure(text="绑定隐藏准星键")
@@ -486,9 +853,19 @@ class ControlPanel:
 
         # Hook a single key press
         def safe_on_key(event):
-             self.root.after(0, lambda: on_key(event))
+             self.post(on_key, event)
 
         hook_id = keyboard.on_press(safe_on_key)
+        self.bind_hook_id = hook_id
+
+    def cancel_hotkey_bind(self):
+        """Drop a pending bind_hotkey key hook, if any"""
+        if self.bind_hook_id is not None:
+            try:
+                keyboard.unhook(self.bind_hook_id)
+            except Exception:
+                pass
+            self.bind_hook_id = None
 
     def add_slider(self, parent, label, var, min_val, max_val, row):
         ttk.Label(parent, text=label).grid(row=row, column=0, padx=5, pady=2)
@@ -506,11 +883,14 @@ class ControlPanel:
         # Always enable image button so user can click it directly to switch mode
         # If user switches dropdown manually, we check if image path is needed
         # Only prompt for image if it's a user interaction (event is not None) or if path is truly empty during init
-        if (style == "Custom" or style == "自定义"):
+        if shape_uses_image(style):
             if not self.config['image_path'].get():
                 # If switched to Custom but no image, prompt to choose
                 # Use 'after' to avoid blocking the event loop immediately
-                if event and event != "Startup": # Only prompt if user manually triggered, not on startup
+                if event == "AutoSwitch":
+                    # Never open a file dialog over the game
+                    print(f"Auto switched preset has no image selected: {self.current_preset_name.get()}")
+                elif event and event != "Startup": # Only prompt if user manually triggered, not on startup
                     self.root.after(100, self.choose_image)
             else:
                 # If we have a path, ensure overlay updates
@@ -546,10 +926,10 @@ class ControlPanel:
         self.pos_y.set(str(self._start_pos_y + dy))
         self.update_pos()
 
-    def start_overlay(self):
+    def start_overlay(self, first_frame=None):
         if self.overlay:
             self.overlay.destroy()
-        self.overlay = CrosshairOverlay(self.root, self.config)
+        self.overlay = CrosshairOverlay(self.root, self.config, first_frame)
         self.update_pos()
 
     def update_overlay(self, _=None):
@@ -600,8 +980,13 @@ class ControlPanel:
         if not name:
             return
             
+        self.presets[name] = self.current_preset_data()
+        self.update_preset_list()
+        self.prerender_presets()
+
+    def current_preset_data(self):
         # Capture current settings
-        preset_data = {
+        return {
             "size": self.config['size'].get(),
             "thickness": self.config['thickness'].get(),
             "color": self.config['color'].get(),
@@ -610,9 +995,6 @@ class ControlPanel:
             "image_path": self.config['image_path'].get()
         }
         
-        self.presets[name] = preset_data
-        self.update_preset_list()
-        
     def load_preset(self, event=None):
         name = self.current_preset_name.get()
         if name == "<--下拉选择预设-->":
@@ -628,8 +1010,36 @@ class ControlPanel:
             self.config['image_path'].set(data.get("image_path", ""))
             
             # Refresh overlay
-            self.on_style_change(event="PresetLoad")
+            self.on_style_change(event="AutoSwitch" if event == "AutoSwitch" else "PresetLoad")
+            self.tray.refresh()
             
+    def start_auto_switch(self):
+        """Switch presets automatically when a game listed in auto_switch_rules comes to the foreground"""
+        if not self.auto_switch_rules:
+            return
+        try:
+            source = WindowsForegroundSource()
+            self.auto_switch = ForegroundWatcher(source, self.auto_switch_rules,
+                                                 lambda name: self.post(self.switch_to_preset, name))
+        except Exception as e:
+            print(f"Error starting foreground watcher: {e}")
+            return
+        self.prerender_presets()
+        self.auto_switch.start()
+
+    def prerender_presets(self):
+        # Presets a rule can switch to are compiled up front so the switch is a cache hit
+        if self.overlay and self.auto_switch:
+            names = self.auto_switch.index.presets()
+            self.overlay.prerender([self.presets[name] for name in names if name in self.presets])
+
+    def switch_to_preset(self, name):
+        if name not in self.presets:
+            print(f"Auto switch target preset not found: {name}")
+            return
+        self.current_preset_name.set(name)
+        self.load_preset(event="AutoSwitch")
+
     def delete_preset(self):
         name = self.current_preset_name.get()
         if name in self.presets:
@@ -645,7 +1055,7 @@ class ControlPanel:
         data = self.presets[name]
         
         # Check if custom image
-        if data.get('style') in ["Custom", "自定义"]:
+        if shape_uses_image(data.get('style')):
             proceed = messagebox.askokcancel(
                 "分享警告", 
                 "该方案使用了自定义图片。\n\n分享方案仅包含配置信息，不包含图片文件。\n接收方需要手动设置同名图片才能正常显示。\n\n是否继续？"
@@ -702,6 +1112,58 @@ class ControlPanel:
             except Exception as e:
                 print(f"Error importing preset: {e}")
 
+    def copy_share_code(self):
+        # Share the selected preset, or the current settings if none is selected
+        name = self.current_preset_name.get()
+        if name in self.presets:
+            data = self.presets[name]
+        else:
+            name, data = "", self.current_preset_data()
+
+        if shape_uses_image(data.get('style')):
+            proceed = messagebox.askokcancel(
+                "分享警告",
+                "该方案使用了自定义图片。\n\n分享码不包含图片文件。\n接收方需要手动选择图片才能正常显示。\n\n是否继续？"
+            )
+            if not proceed:
+                return
+
+        try:
+            code = encode_share_code(name, data)
+        except ValueError as e:
+            messagebox.showerror("错误", f"无法生成分享码：{e}")
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append(code)
+
+    def paste_share_codes(self):
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            text = ""
+        self.apply_share_codes(text.split())
+
+    def apply_share_codes(self, codes):
+        """Add every valid share code as a preset and apply the last one"""
+        decoded, invalid = decode_share_codes(codes)
+        if not decoded:
+            messagebox.showerror("错误", "剪贴板中没有有效的分享码")
+            return
+
+        for index, (name, data) in enumerate(decoded, 1):
+            name = name or f"分享方案{index}"
+            # Keep the local image if an image preset overwrites one of the same name
+            if not data['image_path'] and name in self.presets:
+                data['image_path'] = self.presets[name].get('image_path', "")
+            self.presets[name] = data
+        self.current_preset_name.set(name)
+        self.update_preset_list()
+        self.prerender_presets()
+        self.load_preset()
+
+        if invalid:
+            messagebox.showwarning("提示", f"已导入 {len(decoded)} 个方案，{len(invalid)} 个分享码无效")
+
     def resource_path(self, relative_path):
         """ Get absolute path to resource, works for dev and for PyInstaller """
         try:
@@ -723,6 +1185,52 @@ class ControlPanel:
             
         return os.path.join(app_dir, 'config.json')
 
+    def get_frame_cache_dir(self):
+        cache_dir = os.path.join(os.path.dirname(self.get_config_path()), 'frames')
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        return cache_dir
+
+    def load_first_frame(self):
+        # --no-frame-cache forces the rendered path, to compare startup times
+        if "--no-frame-cache" in sys.argv:
+            return None
+        width, height = CrosshairOverlay.width, CrosshairOverlay.height
+        try:
+            key = frame_key(config_params(self.config), width, height)
+            if key:
+                ppm = read_frame_cache(os.path.join(self.get_frame_cache_dir(), key + ".ppm"), width, height)
+                if ppm is not None:
+                    return tk.PhotoImage(data=ppm, format="ppm")
+        except Exception as e:
+            print(f"Error loading cached frame: {e}")
+        return None
+
+    def update_frame_cache(self):
+        """Store frames for the active settings and every auto-switch preset; drop all others"""
+        if not self.overlay:
+            return
+        wanted = [config_params(self.config)]
+        if self.auto_switch:
+            wanted += [preset_params(self.presets[name]) for name in self.auto_switch.index.presets()
+                       if name in self.presets]
+        try:
+            cache_dir = self.get_frame_cache_dir()
+            keep = set()
+            for params in wanted:
+                key = frame_key(params, self.overlay.width, self.overlay.height)
+                if not key:
+                    continue
+                keep.add(key + ".ppm")
+                path = os.path.join(cache_dir, key + ".ppm")
+                if not os.path.exists(path):
+                    write_frame_cache(path, self.overlay.render_frame(params))
+            for file_name in os.listdir(cache_dir):
+                if file_name not in keep:
+                    os.remove(os.path.join(cache_dir, file_name))
+        except Exception as e:
+            print(f"Error updating frame cache: {e}")
+
     def load_config(self):
         config_path = self.get_config_path()
         if os.path.exists(config_path):
@@ -740,8 +1248,18 @@ class ControlPanel:
                     self.config['image_path'].set(data.get("image_path", ""))
                     self.config['force_admin'].set(data.get("force_admin", False))
                     self.config['hide_hotkey'].set(data.get("hide_hotkey", ""))
+                    self.config['low_memory_tray'].set(data.get("low_memory_tray", False))
                     
                     self.presets = data.get("presets", {})
+                    self.auto_switch_rules = data.get("auto_switch_rules", [])
+
+                    # User-defined crosshair shapes, same layer format as BUILTIN_SHAPES
+                    self.shapes = data.get("shapes", {})
+                    for name, layers in self.shapes.items():
+                        try:
+                            register_shape(name, layers)
+                        except Exception as e:
+                            print(f"Error loading shape '{name}': {e}")
             except Exception as e:
                 print(f"Error loading config: {e}")
 
@@ -764,13 +1282,17 @@ class ControlPanel:
             "image_path": self.config['image_path'].get(),
             "force_admin": self.config['force_admin'].get(),
             "hide_hotkey": self.config['hide_hotkey'].get(),
-            "presets": self.presets
+            "low_memory_tray": self.config['low_memory_tray'].get(),
+            "presets": self.presets,
+            "auto_switch_rules": self.auto_switch_rules,
+            "shapes": self.shapes
         }
         try:
             with open(self.get_config_path(), "w", encoding='utf-8') as f:
                 json.dump(data, f, indent=4, ensure_ascii=False)
         except Exception as e:
             print(f"Error saving config: {e}")
+        self.update_frame_cache()
 
 def check_force_admin():
     # Helper to check config file before initializing UI
@@ -0,0 +1,109 @@
+"""Compact share codes for crosshair presets.
+
+A share code is "MC-" followed by the urlsafe base64 (unpadded) of:
+
+    version, size, thickness, dot, rgb, style id, name length   (SHARE_HEADER)
+    name (utf-8), [style length, style (utf-8) when style id is SHARE_STYLE_NAMED]
+    crc32 of everything above, low 16 bits
+
+Names and style names longer than 255 bytes are truncated on a character
+boundary. Image paths are machine specific and are never shared.
+"""
+import base64
+import struct
+import zlib
+
+SHARE_CODE_PREFIX = "MC-"
+SHARE_CODE_VERSION = 1
+SHARE_HEADER = struct.Struct("<BBBB3sBB")
+SHARE_CHECKSUM = struct.Struct("<H")
+# Built-in style ids are part of the wire format: append only
+SHARE_STYLES = ("十字", "圆点", "混合", "圆圈", "自定义")
+# Older configs stored the English style names; they share the same ids
+SHARE_STYLE_IDS = dict({name: i for i, name in enumerate(SHARE_STYLES)},
+                       Cross=0, Dot=1, Both=2, Circle=3, Custom=4)
+SHARE_STYLE_NAMED = 0xFF
+SHARE_LIMITS = {"size": (5, 100), "thickness": (1, 10), "dot": (1, 20)}
+
+def _encode_text(text):
+    """UTF-8 encode text for a one-byte length field, cutting on a character boundary"""
+    return text.encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+
+def encode_share_code(name, preset):
+    """Pack a preset into a short copy-pasteable text code"""
+    style = preset.get("style", "十字")
+    color = preset.get("color", "#00FF00")
+    if len(color) != 7 or not color.startswith("#"):
+        raise ValueError(f"Unsupported color: {color}")
+    rgb = bytes.fromhex(color[1:])
+    values = []
+    for field, default in (("size", 20), ("thickness", 2), ("dot", 4)):
+        low, high = SHARE_LIMITS[field]
+        values.append(min(max(int(preset.get(field, default)), low), high))
+    name_bytes = _encode_text(name)
+    if style in SHARE_STYLE_IDS:
+        style_id, tail = SHARE_STYLE_IDS[style], b""
+    else:
+        style_bytes = _encode_text(style)
+        style_id, tail = SHARE_STYLE_NAMED, bytes((len(style_bytes),)) + style_bytes
+
+    payload = SHARE_HEADER.pack(SHARE_CODE_VERSION, *values, rgb, style_id, len(name_bytes)) + name_bytes + tail
+    payload += SHARE_CHECKSUM.pack(zlib.crc32(payload) & 0xFFFF)
+    return SHARE_CODE_PREFIX + base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+def decode_share_code(code):
+    """Validate a share code and return (name, preset); raises ValueError if it is invalid"""
+    code = code.strip()
+    if not code.startswith(SHARE_CODE_PREFIX):
+        raise ValueError("Not a share code")
+    body = code[len(SHARE_CODE_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+    except Exception:
+        raise ValueError("Malformed share code")
+
+    end = len(raw) - SHARE_CHECKSUM.size
+    if end < SHARE_HEADER.size:
+        raise ValueError("Share code too short")
+    if SHARE_CHECKSUM.unpack_from(raw, end)[0] != zlib.crc32(memoryview(raw)[:end]) & 0xFFFF:
+        raise ValueError("Share code checksum mismatch")
+    version, size, thickness, dot, rgb, style_id, name_len = SHARE_HEADER.unpack_from(raw)
+    if version != SHARE_CODE_VERSION:
+        raise ValueError(f"Unsupported share code version: {version}")
+    for field, value in (("size", size), ("thickness", thickness), ("dot", dot)):
+        low, high = SHARE_LIMITS[field]
+        if not low <= value <= high:
+            raise ValueError(f"Share code {field} out of range: {value}")
+
+    pos = SHARE_HEADER.size + name_len
+    if style_id == SHARE_STYLE_NAMED:
+        if pos >= end:
+            raise ValueError("Share code truncated")
+        style_end = pos + 1 + raw[pos]
+        if style_end != end:
+            raise ValueError("Share code length mismatch")
+        style = raw[pos + 1:style_end].decode("utf-8")
+    elif style_id < len(SHARE_STYLES) and pos == end:
+        style = SHARE_STYLES[style_id]
+    else:
+        raise ValueError("Share code length mismatch")
+    name = raw[SHARE_HEADER.size:SHARE_HEADER.size + name_len].decode("utf-8")
+
+    return name, {
+        "size": size,
+        "thickness": thickness,
+        "color": "#" + rgb.hex().upper(),
+        "dot": dot,
+        "style": style,
+        "image_path": ""
+    }
+
+def decode_share_codes(codes):
+    """Decode many share codes at once; returns ([(name, preset), ...], [invalid codes])"""
+    decoded, invalid = [], []
+    for code in codes:
+        try:
+            decoded.append(decode_share_code(code))
+        except ValueError:
+            invalid.append(code)
+    return decoded, invalid
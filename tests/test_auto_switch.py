@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from auto_switch import ForegroundSource, ForegroundWatcher, PresetRuleIndex, QueueForegroundSource
+
+RULES = [
+    {"type": "process", "pattern": "CS2.exe", "preset": "CS"},
+    {"type": "title", "pattern": "Legends", "preset": "L"},
+    {"type": "title", "pattern": "Apex", "preset": "A"},
+    {"type": "title", "pattern": "pex Leg", "preset": "overlap"},
+    {"type": "title", "pattern": "a.b", "preset": "dots"},
+]
+
+
+@pytest.mark.parametrize("process_name, title, expected", [
+    ("cs2.exe", "Apex Legends", "CS"),
+    ("CS2.EXE", "", "CS"),
+    ("r5apex.exe", "Apex Legends", "L"),
+    ("r5apex.exe", "APEX", "A"),
+    ("x.exe", "Apex Leg", "A"),
+    ("x.exe", "aXb", None),
+    ("x.exe", "a.b", "dots"),
+    ("", "", None),
+])
+def test_rule_index_match(process_name, title, expected):
+    assert PresetRuleIndex(RULES).match(process_name, title) == expected
+
+
+def test_rule_order_wins_over_position_in_title():
+    rules = [{"type": "title", "pattern": "pex Leg", "preset": "overlap"},
+             {"type": "title", "pattern": "Apex", "preset": "A"}]
+    assert PresetRuleIndex(rules).match("", "Apex Legends") == "overlap"
+
+
+def test_invalid_rules_are_skipped():
+    index = PresetRuleIndex([{"type": "process", "pattern": "", "preset": "X"},
+                             {"type": "window", "pattern": "a", "preset": "X"},
+                             {"type": "title", "pattern": "game"}])
+    assert index.presets() == set()
+    assert index.match("game.exe", "game") is None
+
+
+def test_non_object_rules_are_skipped():
+    index = PresetRuleIndex(["cs2.exe", None, ["title", "Apex"],
+                             {"type": "process", "pattern": "cs2.exe", "preset": "CS2"}])
+    assert index.presets() == {"CS2"}
+    assert index.match("cs2.exe", "") == "CS2"
+
+
+@pytest.mark.parametrize("rules", ["cs2.exe", {"type": "process"}, 5])
+def test_rules_that_are_not_a_list_are_ignored(rules):
+    assert PresetRuleIndex(rules).presets() == set()
+
+
+def test_foreground_source_is_abstract():
+    with pytest.raises(TypeError):
+        ForegroundSource()
+
+
+def test_watcher_switches_from_fake_feed():
+    switches = []
+    switched = threading.Event()
+    source = QueueForegroundSource()
+
+    def on_switch(preset):
+        switches.append(preset)
+        if len(switches) == 4:
+            switched.set()
+
+    watcher = ForegroundWatcher(source, RULES, on_switch, poll_interval=0.01)
+    watcher.start()
+    for window in [("cs2.exe", "Counter-Strike 2"), ("cs2.exe", "Counter-Strike 2"),
+                   ("cs2.exe", "Counter-Strike 2 - loading"), ("chrome.exe", "Apex wiki"),
+                   ("explorer.exe", "Desktop"), ("r5apex.exe", "Apex Legends"),
+                   ("cs2.exe", "Counter-Strike 2")]:
+        source.push(*window)
+    assert switched.wait(2)
+    watcher.stop()
+    watcher.thread.join(timeout=1)
+
+    # Repeats and windows without a rule do not re-fire the same preset
+    assert switches == ["CS", "A", "L", "CS"]
+    assert not watcher.thread.is_alive()
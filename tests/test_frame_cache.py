@@ -0,0 +1,92 @@
+import pytest
+
+from frame_cache import FRAME_CRC, frame_cache_key, ppm_header, read_frame_cache, write_frame_cache
+
+WIDTH, HEIGHT = 4, 3
+VALUES = [20, 2, 4, "#00FF00"]
+
+
+@pytest.fixture
+def ppm():
+    return ppm_header(WIDTH, HEIGHT) + bytes(range(WIDTH * HEIGHT * 3))
+
+
+@pytest.fixture
+def cached(tmp_path, ppm):
+    path = str(tmp_path / "frame.ppm")
+    write_frame_cache(path, ppm)
+    return path
+
+
+def test_round_trip(cached, ppm, tmp_path):
+    assert read_frame_cache(cached, WIDTH, HEIGHT) == ppm
+    assert [p.name for p in tmp_path.iterdir()] == ["frame.ppm"]
+
+
+def test_missing_file(tmp_path):
+    assert read_frame_cache(str(tmp_path / "missing.ppm"), WIDTH, HEIGHT) is None
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.ppm"
+    path.write_bytes(b"")
+    assert read_frame_cache(str(path), WIDTH, HEIGHT) is None
+
+
+@pytest.mark.parametrize("width, height", [(WIDTH + 1, HEIGHT), (WIDTH, HEIGHT - 1)])
+def test_other_dimensions_are_stale(cached, width, height):
+    assert read_frame_cache(cached, width, height) is None
+
+
+@pytest.mark.parametrize("cut", [1, FRAME_CRC.size, FRAME_CRC.size + 1])
+def test_wrong_length(cached, cut):
+    with open(cached, "rb") as f:
+        data = f.read()
+    with open(cached, "wb") as f:
+        f.write(data[:-cut])
+    assert read_frame_cache(cached, WIDTH, HEIGHT) is None
+    with open(cached, "wb") as f:
+        f.write(data + b"\0")
+    assert read_frame_cache(cached, WIDTH, HEIGHT) is None
+
+
+def test_bad_header(cached):
+    with open(cached, "r+b") as f:
+        f.write(b"P5")
+    assert read_frame_cache(cached, WIDTH, HEIGHT) is None
+
+
+def test_crc_mismatch(cached):
+    with open(cached, "r+b") as f:
+        f.seek(len(ppm_header(WIDTH, HEIGHT)) + 5)
+        f.write(b"\xff")
+    assert read_frame_cache(cached, WIDTH, HEIGHT) is None
+
+
+def test_key_is_stable_and_tracks_parameters():
+    key = frame_cache_key("十字", "source", VALUES, WIDTH, HEIGHT)
+    assert key == frame_cache_key("十字", "source", list(VALUES), WIDTH, HEIGHT)
+    others = {
+        frame_cache_key("圆点", "source", VALUES, WIDTH, HEIGHT),
+        frame_cache_key("十字", "edited source", VALUES, WIDTH, HEIGHT),
+        frame_cache_key("十字", "source", [21, 2, 4, "#00FF00"], WIDTH, HEIGHT),
+        frame_cache_key("十字", "source", [20, 2, 4, "#FF0000"], WIDTH, HEIGHT),
+        frame_cache_key("十字", "source", VALUES, WIDTH + 1, HEIGHT),
+    }
+    assert key not in others and len(others) == 5
+
+
+def test_key_tracks_image_content(tmp_path):
+    image = tmp_path / "crosshair.png"
+    image.write_bytes(b"first")
+    first = frame_cache_key("自定义", "source", VALUES, WIDTH, HEIGHT, str(image))
+    assert first != frame_cache_key("自定义", "source", VALUES, WIDTH, HEIGHT)
+    # Same path, edited in place
+    image.write_bytes(b"second")
+    assert frame_cache_key("自定义", "source", VALUES, WIDTH, HEIGHT, str(image)) != first
+    image.write_bytes(b"first")
+    assert frame_cache_key("自定义", "source", VALUES, WIDTH, HEIGHT, str(image)) == first
+
+
+def test_unreadable_image_is_not_cached(tmp_path):
+    assert frame_cache_key("自定义", "source", VALUES, WIDTH, HEIGHT, str(tmp_path / "missing.png")) is None
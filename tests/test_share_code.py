@@ -0,0 +1,97 @@
+import json
+import random
+import timeit
+
+import pytest
+
+from share_code import (SHARE_CODE_PREFIX, SHARE_STYLES, decode_share_code,
+                        decode_share_codes, encode_share_code)
+
+
+def random_preset(rng):
+    return {
+        "size": rng.randint(5, 100),
+        "thickness": rng.randint(1, 10),
+        "color": "#%06X" % rng.randrange(1 << 24),
+        "dot": rng.randint(1, 20),
+        "style": rng.choice(SHARE_STYLES + ("我的准心", "Community T")),
+        "image_path": "",
+    }
+
+
+def random_name(rng):
+    alphabet = "abcXYZ 019_-准心方案一二三🎯é"
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+
+def test_round_trip_property():
+    rng = random.Random(20261019)
+    for _ in range(5000):
+        name, preset = random_name(rng), random_preset(rng)
+        code = encode_share_code(name, preset)
+        assert code.startswith(SHARE_CODE_PREFIX)
+        assert decode_share_code(code) == (name, preset)
+
+
+@pytest.mark.parametrize("name", ["方案一", "🎯 CS2", "é" * 10, ""])
+def test_round_trip_non_ascii_names(name):
+    preset = {"size": 20, "thickness": 2, "color": "#00FF00", "dot": 4, "style": "十字", "image_path": ""}
+    assert decode_share_code(encode_share_code(name, preset)) == (name, preset)
+
+
+@pytest.mark.parametrize("name", ["a" + "准" * 100, "🎯" * 80, "x" * 300])
+def test_long_names_truncate_on_character_boundary(name):
+    preset = {"size": 20, "thickness": 2, "color": "#00FF00", "dot": 4, "style": "准" * 100, "image_path": ""}
+    decoded_name, decoded = decode_share_code(encode_share_code(name, preset))
+    assert len(decoded_name.encode("utf-8")) <= 255
+    assert name.startswith(decoded_name)
+    assert preset["style"].startswith(decoded["style"])
+
+
+def test_legacy_style_names_share_builtin_ids():
+    preset = {"size": 20, "thickness": 2, "color": "#00FF00", "dot": 4, "style": "Cross"}
+    assert decode_share_code(encode_share_code("", preset))[1]["style"] == "十字"
+    assert encode_share_code("", preset) == encode_share_code("", dict(preset, style="十字"))
+
+
+def test_rejects_corrupted_codes():
+    code = encode_share_code("方案", {"style": "圆圈"})
+    flipped = code[:-3] + ("A" if code[-3] != "A" else "B") + code[-2:]
+    for bad in ["", "MC-", "junk", code[:-4], flipped, code.replace("MC-", "XX-")]:
+        with pytest.raises(ValueError):
+            decode_share_code(bad)
+
+
+def test_batch_decode_splits_valid_and_invalid():
+    rng = random.Random(1)
+    codes = [encode_share_code(random_name(rng), random_preset(rng)) for _ in range(50)]
+    decoded, invalid = decode_share_codes(codes + ["nope", codes[0][:-2]])
+    assert [decode_share_code(code) for code in codes] == decoded
+    assert invalid == ["nope", codes[0][:-2]]
+
+
+def test_decode_throughput_against_json():
+    # The JSON path is what export_preset writes and import_preset reads and sanitizes
+    preset = {"size": 20, "thickness": 2, "color": "#00FF00", "dot": 4, "style": "混合", "image_path": ""}
+    code = encode_share_code("方案一", preset)
+    document = json.dumps(dict(preset, name="方案一"), indent=4, ensure_ascii=False)
+
+    def json_path():
+        data = json.loads(document)
+        return data.get("name"), {
+            "size": data.get("size", 20),
+            "thickness": data.get("thickness", 2),
+            "color": data.get("color", "#00FF00"),
+            "dot": data.get("dot", 4),
+            "style": data.get("style", "十字"),
+            "image_path": data.get("image_path", ""),
+        }
+
+    assert json_path() == decode_share_code(code)
+    runs = 20000
+    share_us = min(timeit.repeat(lambda: decode_share_code(code), number=runs, repeat=3)) / runs * 1e6
+    json_us = min(timeit.repeat(json_path, number=runs, repeat=3)) / runs * 1e6
+    print(f"\nshare code decode: {share_us:.2f} us, JSON decode: {json_us:.2f} us, "
+          f"code {len(code)} chars vs JSON {len(document)} chars")
+    assert share_us < 100
+    assert len(code) < len(document)
@@ -0,0 +1,138 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+class StubIcon:
+    """pystray.Icon stand-in: run() blocks its thread until stop(), like the real backends"""
+
+    instances = []
+
+    def __init__(self, name, image, title, menu):
+        self.menu = menu
+        self.visible = False
+        self.menu_updates = 0
+        self.stopped = threading.Event()
+        StubIcon.instances.append(self)
+
+    def run(self, setup=None):
+        if setup:
+            setup(self)
+        self.stopped.wait()
+
+    def update_menu(self):
+        self.menu_updates += 1
+
+    def stop(self):
+        self.stopped.set()
+
+
+class FakeVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class FakePanel:
+    crosshair_visible = True
+
+    def __init__(self):
+        self.config = {'low_memory_tray': FakeVar(False)}
+        self.posted = []
+
+    def resource_path(self, relative_path):
+        return relative_path
+
+    def active_preset_name(self):
+        return "CS2"
+
+    def post(self, callback, *args):
+        self.posted.append(callback)
+
+    def toggle_crosshair_visible(self, requested_at=None):
+        pass
+
+    def toggle_low_memory_tray(self):
+        pass
+
+    def show_window(self, requested_at=None):
+        pass
+
+    def quit_application(self):
+        pass
+
+
+@pytest.fixture
+def tray(monkeypatch):
+    pystray = types.ModuleType("pystray")
+    pystray.Icon = StubIcon
+    pystray.Menu = lambda *items: items
+    pystray.MenuItem = lambda text, action, **kwargs: (text, action, kwargs)
+    image = types.ModuleType("PIL.Image")
+    image.open = lambda path: (_ for _ in ()).throw(OSError(path))
+    image.new = lambda mode, size, color=None: object()
+    pil = types.ModuleType("PIL")
+    pil.Image = image
+    monkeypatch.setitem(sys.modules, "pystray", pystray)
+    monkeypatch.setitem(sys.modules, "PIL", pil)
+    monkeypatch.setitem(sys.modules, "PIL.Image", image)
+    monkeypatch.delitem(sys.modules, "tray", raising=False)
+    StubIcon.instances = []
+    return importlib.import_module("tray")
+
+
+def test_no_thread_leak_across_hide_restore_cycles(tray):
+    baseline = threading.active_count()
+    panel = FakePanel()
+    service = tray.TrayService(panel)
+    service.set_visible(True)
+    assert service.ready.wait(1)
+
+    for _ in range(1000):
+        service.set_visible(True)
+        assert service.icon.visible
+        service.set_visible(False)
+        assert not service.icon.visible
+
+    assert len(StubIcon.instances) == 1
+    assert threading.active_count() == baseline + 1
+
+    service.stop()
+    StubIcon.instances[0].stopped.wait(1)
+    deadline = time.monotonic() + 2
+    while threading.active_count() > baseline and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert threading.active_count() == baseline
+
+
+def test_menu_refreshes_whenever_the_icon_is_shown(tray):
+    service = tray.TrayService(FakePanel())
+    service.set_visible(True)
+    assert service.ready.wait(1)
+    updates = service.icon.menu_updates
+    for _ in range(5):
+        service.set_visible(False)
+        service.set_visible(True)
+    assert service.icon.menu_updates == updates + 5
+    service.stop()
+
+
+def test_menu_actions_are_posted_to_the_tk_thread(tray):
+    panel = FakePanel()
+    service = tray.TrayService(panel)
+    service.set_visible(True)
+    assert service.ready.wait(1)
+    labels = {}
+    for text, action, _ in service.icon.menu:
+        labels[text if isinstance(text, str) else text(None)] = action
+    assert labels["方案: CS2"] == service.on_noop
+    for text in ("隐藏准星", "显示设置", "退出程序"):
+        labels[text](service.icon, None)
+    assert panel.posted == [panel.toggle_crosshair_visible, panel.show_window, panel.quit_application]
+    service.stop()
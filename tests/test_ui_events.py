@@ -0,0 +1,184 @@
+import queue
+import statistics
+import threading
+import time
+import tracemalloc
+
+from ui_events import UiEventQueue
+from visibility import CanvasVisibility
+
+
+class FakeTkRoot:
+    """Stands in for tk.Tk: generated virtual events are dispatched on a dedicated 'Tk' thread"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.events = queue.Queue()
+        self.generated = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.mainloop, daemon=True)
+
+    def bind(self, sequence, handler):
+        self.handlers[sequence] = handler
+
+    def event_generate(self, sequence, when=None):
+        if not self.thread.is_alive():
+            raise RuntimeError("main thread is not in main loop")
+        with self.lock:
+            self.generated += 1
+        self.events.put(sequence)
+
+    def mainloop(self):
+        while True:
+            sequence = self.events.get()
+            if sequence is None:
+                break
+            self.handlers[sequence](None)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.events.put(None)
+        self.thread.join(timeout=5)
+
+
+class FakeCanvas:
+    """Canvas with a fixed set of crosshair items; records which thread touches it"""
+
+    def __init__(self):
+        self.items = {1: "normal", 2: "normal"}
+        self.flushes = 0
+        self.threads = set()
+
+    def itemconfigure(self, tag, state):
+        self.threads.add(threading.get_ident())
+        for item in self.items:
+            self.items[item] = state
+
+    def update_idletasks(self):
+        self.flushes += 1
+
+
+class FakeOverlay:
+    """Drives the real CanvasVisibility the way ControlPanel.toggle_crosshair_visible does"""
+
+    def __init__(self):
+        self.canvas = FakeCanvas()
+        self.visibility = CanvasVisibility(self.canvas)
+        self.toggles = 0
+
+    def toggle(self, requested_at=None):
+        self.visibility.set_visible(not self.visibility.visible, requested_at)
+        self.toggles += 1
+
+
+def fire_toggles(events, overlay, posters, per_poster, interval):
+    def worker():
+        for _ in range(per_poster):
+            events.post(overlay.toggle, time.perf_counter())
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=worker) for _ in range(posters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return predicate()
+
+
+def test_hundreds_of_toggles_per_second_without_leaks():
+    baseline_threads = threading.active_count()
+    root = FakeTkRoot()
+    events = UiEventQueue(root)
+    overlay = FakeOverlay()
+    root.start()
+
+    # Warm up, then measure allocations over a second, equally sized burst
+    fire_toggles(events, overlay, posters=4, per_poster=250, interval=0.002)
+    assert wait_until(lambda: overlay.toggles == 1000)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    fire_toggles(events, overlay, posters=4, per_poster=250, interval=0.002)
+    assert wait_until(lambda: overlay.toggles == 2000)
+    rate = 1000 / (time.perf_counter() - started)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    assert rate > 200
+    assert overlay.visibility.visible is True
+    assert overlay.canvas.items == {1: "normal", 2: "normal"}
+    assert overlay.canvas.threads == {root.thread.ident}
+    assert overlay.canvas.flushes == 2000
+    assert events.queue.empty() and not events.wakeup_pending
+    assert growth < 256 * 1024
+
+    count, average, worst = overlay.visibility.stats()
+    assert count == 256
+    assert 0 <= average <= worst
+
+    root.stop()
+    assert wait_until(lambda: threading.active_count() == baseline_threads)
+
+
+def test_burst_shares_one_wakeup():
+    root = FakeTkRoot()
+    events = UiEventQueue(root)
+    overlay = FakeOverlay()
+    busy = threading.Event()
+    release = threading.Event()
+    root.start()
+
+    # Keep the Tk thread busy so the whole burst lands while one wakeup is outstanding
+    events.post(lambda: (busy.set(), release.wait(5)))
+    assert busy.wait(1)
+    generated = root.generated
+    for _ in range(500):
+        events.post(overlay.toggle, time.perf_counter())
+    assert root.generated == generated + 1
+    release.set()
+
+    assert wait_until(lambda: overlay.toggles == 500)
+    assert overlay.visibility.visible is True
+    root.stop()
+
+
+def test_hidden_state_survives_redraw():
+    overlay = FakeOverlay()
+    overlay.toggle()
+    overlay.canvas.items[3] = "normal"  # item drawn by a redraw while hidden
+    overlay.visibility.apply()
+    assert set(overlay.canvas.items.values()) == {"hidden"}
+
+
+def test_posted_toggle_runs_without_waiting_for_a_poll():
+    root = FakeTkRoot()
+    events = UiEventQueue(root)
+    latencies = []
+    root.start()
+    for _ in range(200):
+        done = threading.Event()
+        requested_at = time.perf_counter()
+        events.post(lambda: (latencies.append(time.perf_counter() - requested_at), done.set()))
+        assert done.wait(1)
+    root.stop()
+    assert statistics.median(latencies) * 1000 < 16
+
+
+def test_post_before_main_loop_is_drained_later():
+    root = FakeTkRoot()
+    events = UiEventQueue(root)
+    ran = []
+    events.post(ran.append, 1)
+    events.post(ran.append, 2)
+    assert ran == [] and not events.wakeup_pending
+    events.drain()
+    assert ran == [1, 2]
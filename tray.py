@@ -0,0 +1,84 @@
+"""System tray icon for the control panel."""
+import threading
+import time
+
+from PIL import Image
+import pystray
+from pystray import MenuItem as item
+
+
+class TrayService:
+    """One tray icon for the life of the process.
+
+    The icon image is decoded once and pystray runs on a single daemon thread,
+    started on first use. Hiding to and restoring from the tray only toggles the
+    icon's visibility and refreshes the menu in place. Menu actions run on the
+    tray thread and are posted to the Tk thread through ControlPanel.post.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.icon = None
+        self.ready = threading.Event()
+        self.wanted_visible = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.icon:
+            return
+        try:
+            icon_image = Image.open(self.panel.resource_path("tx.ico"))
+            icon_image.load()
+        except:
+            # Fallback if icon load fails
+            icon_image = Image.new('RGB', (64, 64), color = (73, 109, 137))
+
+        menu = pystray.Menu(
+            item(lambda i: f"方案: {self.panel.active_preset_name() or '未选择'}", self.on_noop, enabled=False),
+            item(lambda i: "隐藏准星" if self.panel.crosshair_visible else "显示准星", self.on_toggle),
+            item('低内存模式', self.on_low_memory, checked=lambda i: self.panel.config['low_memory_tray'].get()),
+            item('显示设置', self.on_show, default=True),
+            item('退出程序', self.on_quit))
+        self.icon = pystray.Icon("name", icon_image, "自定义准心", menu)
+
+        # Run tray icon in a separate thread to avoid blocking main loop
+        threading.Thread(target=self.icon.run, args=(self.on_ready,), daemon=True).start()
+
+    def on_ready(self, icon):
+        with self.lock:
+            self.ready.set()
+            icon.visible = self.wanted_visible
+
+    def set_visible(self, visible):
+        if visible:
+            self.start()
+        with self.lock:
+            self.wanted_visible = visible
+            if self.ready.is_set():
+                self.icon.visible = visible
+                if visible:
+                    # Presets may have been saved, deleted or imported while the icon was hidden
+                    self.icon.update_menu()
+
+    def refresh(self):
+        if self.ready.is_set():
+            self.icon.update_menu()
+
+    def stop(self):
+        if self.icon:
+            self.icon.stop()
+
+    def on_noop(self, icon, item):
+        pass
+
+    def on_toggle(self, icon, item):
+        self.panel.post(self.panel.toggle_crosshair_visible, time.perf_counter())
+
+    def on_low_memory(self, icon, item):
+        self.panel.post(self.panel.toggle_low_memory_tray)
+
+    def on_show(self, icon, item):
+        self.panel.post(self.panel.show_window, time.perf_counter())
+
+    def on_quit(self, icon, item):
+        self.panel.post(self.panel.quit_application)
@@ -0,0 +1,52 @@
+"""Hand-off of callbacks from worker threads (hotkey, tray, foreground watcher) to the Tk thread."""
+import queue
+import threading
+import tkinter as tk
+
+
+class UiEventQueue:
+    """Queue of callbacks that the Tk thread runs as soon as it is idle.
+
+    post() wakes the Tk thread with a virtual event instead of waiting for a poll,
+    and at most one wakeup is outstanding however many callbacks are posted, so a
+    burst of hotkey presses costs one event. Nothing runs while the queue is empty.
+    """
+
+    EVENT = "<<UiEventQueue>>"
+
+    def __init__(self, root):
+        self.root = root
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.wakeup_pending = False
+        root.bind(self.EVENT, self.drain)
+
+    def post(self, callback, *args):
+        """Run callback(*args) on the Tk thread; safe to call from any thread"""
+        self.queue.put((callback, args))
+        with self.lock:
+            if self.wakeup_pending:
+                return
+            self.wakeup_pending = True
+        try:
+            self.root.event_generate(self.EVENT, when="tail")
+        except (RuntimeError, tk.TclError):
+            # Tk is not in its main loop (starting up or shutting down); the next
+            # post or the drain scheduled at startup picks the callback up
+            with self.lock:
+                self.wakeup_pending = False
+
+    def drain(self, event=None):
+        # Clear the flag before emptying the queue so a concurrent post either
+        # lands in this drain or schedules a new wakeup
+        with self.lock:
+            self.wakeup_pending = False
+        while True:
+            try:
+                callback, args = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error handling UI event: {e}")
@@ -0,0 +1,42 @@
+"""Instant show/hide of the crosshair canvas, with toggle-latency instrumentation."""
+import time
+from collections import deque
+
+
+class CanvasVisibility:
+    """Shows or hides every item on a canvas while its window stays mapped.
+
+    Hiding only changes item state, so the overlay keeps its topmost and
+    click-through styles and no items are created or destroyed by a toggle.
+    The latency from the toggle request to the flushed repaint is kept for the
+    last 256 toggles.
+    """
+
+    def __init__(self, canvas, budget_ms=16):
+        self.canvas = canvas
+        self.budget_ms = budget_ms
+        self.visible = True
+        self.latencies = deque(maxlen=256)
+
+    def set_visible(self, visible, requested_at=None):
+        """requested_at is the perf_counter() time the toggle was asked for, e.g. by the hotkey thread"""
+        start = time.perf_counter()
+        self.visible = visible
+        self.canvas.itemconfigure("all", state="normal" if visible else "hidden")
+        self.canvas.update_idletasks()
+        latency = time.perf_counter() - (requested_at or start)
+        self.latencies.append(latency)
+        if latency * 1000 > self.budget_ms:
+            print(f"Slow crosshair toggle: {latency * 1000:.1f} ms")
+
+    def apply(self):
+        """Re-apply the hidden state to items drawn since the last toggle"""
+        if not self.visible:
+            self.canvas.itemconfigure("all", state="hidden")
+
+    def stats(self):
+        """Return (count, average ms, worst ms) over the recent toggles"""
+        if not self.latencies:
+            return 0, 0.0, 0.0
+        count = len(self.latencies)
+        return count, sum(self.latencies) / count * 1000, max(self.latencies) * 1000